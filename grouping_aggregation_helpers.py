@@ -1,9 +1,9 @@
 
-from typing import Dict, Iterable, Iterator, Tuple, Any
+from typing import Dict, Iterable, Iterator, Sequence, Tuple, Any
 from operator import itemgetter
 from collections import defaultdict, Counter
 from functools import reduce
-from math import sqrt
+from math import inf, sqrt
 from orders import Order
 
 def aggregate_sum_by_key(
@@ -19,12 +19,33 @@ def aggregate_sum_by_key(
     """
     totals: Dict[Any, float] = defaultdict(float)
 
-    # map + lambda creates a stream of (key, value) pairs
-    for key, value in map(lambda o: (key_fn(o), value_fn(o)), orders):
-        totals[key] += value
+    for o in orders:
+        totals[key_fn(o)] += value_fn(o)
 
     return dict(totals)
 
+def aggregate_sums_by_key(
+    orders: Iterable[Order],
+    key_fn,
+    value_fns: Tuple[Any, ...],
+) -> Dict[Any, Tuple[float, ...]]:
+    """
+    Generic "group by key and sum several values" helper, in a single pass.
+
+    key_fn    : Order -> key
+    value_fns : tuple of Order -> numeric value, one per summed column
+    Returns {key: (sum_0, sum_1, ...)} in the same order as value_fns.
+    """
+    width = len(value_fns)
+    totals: Dict[Any, list[float]] = defaultdict(lambda: [0.0] * width)
+
+    for o in orders:
+        acc = totals[key_fn(o)]
+        for i, value_fn in enumerate(value_fns):
+            acc[i] += value_fn(o)
+
+    return {key: tuple(acc) for key, acc in totals.items()}
+
 def aggregate_mean_by_key(
     orders: Iterable[Order],
     key_fn,
@@ -36,8 +57,9 @@ def aggregate_mean_by_key(
     total: Dict[Any, float] = defaultdict(float)
     count: Dict[Any, int] = defaultdict(int)
 
-    for key, value in map(lambda o: (key_fn(o), value_fn(o)), orders):
-        total[key] += value
+    for o in orders:
+        key = key_fn(o)
+        total[key] += value_fn(o)
         count[key] += 1
 
     return {
@@ -60,7 +82,9 @@ def aggregate_stddev_by_key(
     # Stats per key: count, mean, M2
     stats: Dict[Any, tuple[int, float, float]] = {}
 
-    for key, value in map(lambda o: (key_fn(o), value_fn(o)), orders):
+    for o in orders:
+        key = key_fn(o)
+        value = value_fn(o)
         count, mean, m2 = stats.get(key, (0, 0.0, 0.0))
         count += 1
         delta = value - mean
@@ -89,15 +113,129 @@ def aggregate_min_max_count_by_key(
     """
     Generic "group by key and compute min, max, count" helper.
     """
-    stats: Dict[Any, tuple[float, float, int]] = {}
-    for key, value in map(lambda o: (key_fn(o), value_fn(o)), orders):
-        if key not in stats:
-            stats[key] = (value, value, 1)
-        else:
-            current_min, current_max, count = stats[key]
-            stats[key] = (
-                min(current_min, value),
-                max(current_max, value),
-                count + 1,
-            )
-    return stats
+    # One lookup per row; [min, max, count] is mutated in place instead of rebuilt
+    stats: Dict[Any, list] = defaultdict(lambda: [inf, -inf, 0])
+    for o in orders:
+        value = value_fn(o)
+        s = stats[key_fn(o)]
+        if value < s[0]:
+            s[0] = value
+        if value > s[1]:
+            s[1] = value
+        s[2] += 1
+    return {key: tuple(s) for key, s in stats.items()}
+
+
+# Columnar variants: operate on parallel code/value columns from orders.ColumnStore
+# instead of Order objects. Keys are small ints, so the group-by dict hashes ints.
+
+def pack_codes(code_columns: Sequence[Sequence[int]], vocabs: Sequence[Sequence[Any]]) -> list[int]:
+    """
+    Pack parallel dictionary-code columns into one mixed-radix int per row
+    (codes_a * len(vocab_b) + codes_b, and so on for more columns).
+    """
+    packed = list(code_columns[0])
+    for codes, vocab in zip(code_columns[1:], vocabs[1:]):
+        radix = len(vocab)
+        packed = [p * radix + c for p, c in zip(packed, codes)]
+    return packed
+
+
+def unpack_keys(grouped: Dict[int, Any], vocabs: Sequence[Sequence[Any]]) -> Dict[tuple, Any]:
+    """
+    Inverse of pack_codes at the output boundary: turn packed int keys back
+    into tuples of vocabulary values.
+    """
+    result: Dict[tuple, Any] = {}
+    for code, value in grouped.items():
+        parts = []
+        for vocab in reversed(vocabs):
+            code, index = divmod(code, len(vocab))
+            parts.append(vocab[index])
+        result[tuple(reversed(parts))] = value
+    return result
+
+
+def aggregate_sum_by_codes(codes: Sequence[int], values: Sequence[float]) -> Dict[int, float]:
+    """
+    Columnar "group by code and sum value" helper.
+    Only codes that occur are returned (absent groups are not reported as 0).
+    """
+    totals: Dict[int, float] = defaultdict(float)
+    for code, value in zip(codes, values):
+        totals[code] += value
+    return dict(totals)
+
+
+def aggregate_sums_by_codes(
+    codes: Sequence[int],
+    value_columns: Tuple[Sequence[float], ...],
+) -> Dict[int, Tuple[float, ...]]:
+    """
+    Columnar "group by code and sum several values" helper, in a single pass.
+    """
+    width = len(value_columns)
+    totals: Dict[int, list[float]] = defaultdict(lambda: [0.0] * width)
+    for code, values in zip(codes, zip(*value_columns)):
+        acc = totals[code]
+        for i, value in enumerate(values):
+            acc[i] += value
+    return {code: tuple(acc) for code, acc in totals.items()}
+
+
+def welford_by_codes(
+    codes: Sequence[int],
+    values: Sequence[float],
+    n_groups: int,
+) -> Tuple[list[int], list[float], list[float]]:
+    """
+    Welford's recurrence over a code column, with per-group state held in three
+    preallocated lists (count, mean, M2) indexed by code instead of a dict of tuples.
+    """
+    counts = [0] * n_groups
+    means = [0.0] * n_groups
+    m2 = [0.0] * n_groups
+    for code, value in zip(codes, values):
+        counts[code] += 1
+        delta = value - means[code]
+        means[code] += delta / counts[code]
+        m2[code] += delta * (value - means[code])
+    return counts, means, m2
+
+
+def aggregate_stddev_by_codes(
+    codes: Sequence[int],
+    values: Sequence[float],
+    n_groups: int,
+    sample: bool = True,
+) -> Dict[int, float]:
+    """
+    Columnar counterpart of aggregate_stddev_by_key; codes must be < n_groups.
+    Same semantics: a single observation yields 0 even for sample stddev.
+    """
+    counts, _, m2 = welford_by_codes(codes, values, n_groups)
+    result: Dict[int, float] = {}
+    for code, count in enumerate(counts):
+        if count == 0:
+            continue
+        denom = (count - 1) if sample and count > 1 else count
+        result[code] = sqrt(m2[code] / denom)
+    return result
+
+
+def aggregate_min_max_count_by_codes(
+    codes: Sequence[int],
+    values: Sequence[float],
+) -> Dict[int, tuple[float, float, int]]:
+    """
+    Columnar counterpart of aggregate_min_max_count_by_key.
+    """
+    stats: Dict[int, list] = defaultdict(lambda: [inf, -inf, 0])
+    for code, value in zip(codes, values):
+        s = stats[code]
+        if value < s[0]:
+            s[0] = value
+        if value > s[1]:
+            s[1] = value
+        s[2] += 1
+    return {code: tuple(s) for code, s in stats.items()}
@@ -1,16 +1,80 @@
 from __future__ import annotations
 
 import csv
+from array import array
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
-from typing import Dict, Iterator, Optional, TextIO
+from typing import Dict, Iterator, NamedTuple, Optional, TextIO
 
 #this would normally be configured elsewhere
 CSV_PATH = "data/orders.csv"
 
+_EPOCH = datetime(1970, 1, 1)
+
+
+# Bound once at import; parse_datetime runs twice per row.
+_fromisoformat = datetime.fromisoformat
+_strptime = datetime.strptime
+
+
+def _parse_datetime_fallback(cleaned: str) -> Optional[datetime]:
+    """Format-driven parse for anything the fixed-position fast path does not cover."""
+    try:
+        if cleaned[4:5] == "/":
+            return _strptime(cleaned, "%Y/%m/%d %H:%M:%S.%f")
+        return _fromisoformat(cleaned)
+    except ValueError:
+        return None
+
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    """
+    Parse an Order.Date / Ship.Date cell; returns None when empty or unparseable.
+
+    "YYYY-MM-DD ..." goes to the C-level fromisoformat. The slash form
+    "YYYY/MM/DD HH:MM:SS.fff" keeps every field at a fixed offset, so it is
+    sliced and passed straight to datetime() instead of through strptime.
+    """
+    if not value:
+        return None
+    s = value.strip()
+    if s[4:5] == "/" and s[7:8] == "/":
+        n = len(s)
+        if n == 10:
+            digits, time_fields, fraction = s[0:4] + s[5:7] + s[8:10], None, ""
+        elif 19 <= n <= 26 and s[10] in " T" and s[13] == s[16] == ":" and (n == 19 or s[19] == "."):
+            time_fields = (s[11:13], s[14:16], s[17:19])
+            digits, fraction = s[0:4] + s[5:7] + s[8:10] + "".join(time_fields), s[20:]
+        else:
+            return _parse_datetime_fallback(s)
+        # int() would also accept signs, "_" and whitespace, so require plain ASCII digits
+        if not (digits.isascii() and digits.isdigit()) or (
+            n > 19 and not (fraction.isascii() and fraction.isdigit())
+        ):
+            return _parse_datetime_fallback(s)
+        try:
+            if time_fields is None:
+                return datetime(int(s[0:4]), int(s[5:7]), int(s[8:10]))
+            return datetime(
+                int(s[0:4]), int(s[5:7]), int(s[8:10]),
+                *map(int, time_fields), int(fraction.ljust(6, "0")) if fraction else 0,
+            )
+        except ValueError:  # out-of-range field, e.g. month 13
+            return None
+    return _parse_datetime_fallback(s)
+
+# Column order expected by Order.from_tuple / Order.column_positions
+_REQUIRED_COLUMNS = (
+    "Category", "Sub.Category", "State", "Country", "Customer.ID", "Customer.Name", "Year",
+    "Market", "Sales", "Profit", "Discount", "Quantity", "Shipping.Cost",
+)
+_OPTIONAL_COLUMNS = ("Product.ID", "Product.Name", "Order.Date", "Ship.Date")
+
 #this file defines the Order data model and a function to stream orders from a CSV file
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Order:
     """
     Immutable representation of a single order line.
@@ -36,25 +100,52 @@ class Order:
     order_date: Optional[datetime] = None
     ship_date: Optional[datetime] = None
 
+    @staticmethod
+    def column_positions(header: list[str]) -> tuple[Optional[int], ...]:
+        """
+        Resolve header names to row positions once per file, in from_tuple's field
+        order; optional columns missing from the header resolve to None.
+        """
+        idx = {name: i for i, name in enumerate(header)}
+        return tuple(idx[name] for name in _REQUIRED_COLUMNS) + tuple(
+            idx.get(name) for name in _OPTIONAL_COLUMNS
+        )
+
+    @staticmethod
+    def from_tuple(row: list[str], positions: tuple[Optional[int], ...]) -> "Order":
+        """
+        Convert a positional csv.reader row into an Order instance.
+        `positions` comes from Order.column_positions(header).
+        """
+        (
+            i_cat, i_sub, i_state, i_country, i_cust_id, i_cust_name, i_year, i_market,
+            i_sales, i_profit, i_disc, i_qty, i_ship_cost,
+            i_product_id, i_product_name, i_order_date, i_ship_date,
+        ) = positions
+
+        return Order(
+            category=row[i_cat],
+            sub_category=row[i_sub],
+            state=row[i_state],
+            country=row[i_country],
+            customer_id=row[i_cust_id],
+            customer_name=row[i_cust_name],
+            year=int(row[i_year]),
+            market=row[i_market],
+            sales=float(row[i_sales]),
+            profit=float(row[i_profit]),
+            discount=float(row[i_disc]),
+            quantity=int(row[i_qty]),
+            shipping_cost=float(row[i_ship_cost]),
+            product_id=row[i_product_id] if i_product_id is not None else None,
+            product_name=row[i_product_name] if i_product_name is not None else None,
+            order_date=parse_datetime(row[i_order_date]) if i_order_date is not None else None,
+            ship_date=parse_datetime(row[i_ship_date]) if i_ship_date is not None else None,
+        )
+
     @staticmethod
     def from_row(row: Dict[str, str]) -> "Order":
         """Convert a CSV dict row into an Order instance."""
-        def parse_dt(value: str) -> Optional[datetime]:
-            if not value:
-                return None
-            cleaned = value.strip()
-            parsers = [
-                lambda v: datetime.fromisoformat(v.replace(" ", "T")),
-                lambda v: datetime.strptime(v, "%Y-%m-%d %H:%M:%S.%f"),
-                lambda v: datetime.strptime(v, "%Y/%m/%d %H:%M:%S.%f"),
-            ]
-            for parse in parsers:
-                try:
-                    return parse(cleaned)
-                except ValueError:
-                    continue
-            return None
-
         return Order(
             category=row["Category"],
             sub_category=row["Sub.Category"],
@@ -71,8 +162,8 @@ class Order:
             shipping_cost=float(row["Shipping.Cost"]),
             product_id=row.get("Product.ID"),
             product_name=row.get("Product.Name"),
-            order_date=parse_dt(row.get("Order.Date", "")),
-            ship_date=parse_dt(row.get("Ship.Date", "")),
+            order_date=parse_datetime(row.get("Order.Date", "")),
+            ship_date=parse_datetime(row.get("Ship.Date", "")),
         )
 
 def stream_orders(source: str | Path | TextIO = CSV_PATH) -> Iterator[Order]:
@@ -83,9 +174,15 @@ def stream_orders(source: str | Path | TextIO = CSV_PATH) -> Iterator[Order]:
     """
 
     def iter_orders(file_obj: TextIO) -> Iterator[Order]:
-        reader = csv.DictReader(file_obj)
-        for order in map(lambda r: Order.from_row(r), reader):
-            yield order
+        # csv.reader + header positions avoids building a dict per row (DictReader)
+        reader = csv.reader(file_obj)
+        header = next(reader, None)
+        if header is None:  # empty file
+            return
+        positions = Order.column_positions(header)
+        for row in reader:
+            if row:  # skip blank lines, as DictReader did
+                yield Order.from_tuple(row, positions)
 
     # Accept either a file-like object (for tests/StringIO) or a filesystem path
     if hasattr(source, "read"):
@@ -94,3 +191,139 @@ def stream_orders(source: str | Path | TextIO = CSV_PATH) -> Iterator[Order]:
         path = Path(source)
         with path.open(newline="", encoding="utf-8") as f:
             yield from iter_orders(f)
+
+
+
+def collect_orders(source: str | Path | TextIO = CSV_PATH) -> list[Order]:
+    """
+    Materialize stream_orders once, for callers that need several passes over the
+    same Orders (a generator is single-shot; a list can be re-iterated freely).
+    """
+    return list(stream_orders(source))
+
+class ColumnStore(NamedTuple):
+    """
+    Column-oriented (struct-of-arrays) view of the orders file.
+
+    Numeric columns are contiguous `array` buffers. String/year columns used as
+    group-by keys are dictionary-encoded: `<name>_codes[i]` indexes into the
+    `<name>s` vocabulary tuple. Timestamps are seconds since 1970-01-01
+    (naive values are taken as UTC, so differences are exact), NaN when the
+    date is missing.
+    """
+    year_codes: array
+    years: tuple[int, ...]
+    market_codes: array
+    markets: tuple[str, ...]
+    category_codes: array
+    categories: tuple[str, ...]
+    sub_category_codes: array
+    sub_categories: tuple[str, ...]
+    sales: array
+    profit: array
+    discount: array
+    quantity: array
+    shipping_cost: array
+    order_ts: array
+    ship_ts: array
+
+
+def load_columns(source: str | Path | TextIO = CSV_PATH) -> ColumnStore:
+    """
+    Read a CSV path or file-like object once into a ColumnStore.
+
+    Unlike stream_orders, no per-row Order objects are built; only the
+    columns the queries group or aggregate on are kept. Work is done a column
+    at a time: one transpose of the projected fields, then C-level map() conversions.
+    """
+
+    def encode(values) -> tuple[array, tuple]:
+        # dict.fromkeys keeps first-appearance order, so codes match a row-by-row setdefault
+        index = {value: code for code, value in enumerate(dict.fromkeys(values))}
+        return array("i", map(index.__getitem__, values)), tuple(index)
+
+    def timestamps(values) -> array:
+        # Dates repeat heavily (~1.5k distinct per ~51k rows), so parse each distinct value once
+        def timestamp(value: str) -> float:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return float("nan")
+            if parsed.tzinfo is not None:  # offset-aware (e.g. "+00:00"): POSIX seconds
+                return parsed.timestamp()
+            return (parsed - _EPOCH).total_seconds()
+
+        memo = {value: timestamp(value) for value in set(values)}
+        return array("d", map(memo.__getitem__, values))
+
+    def read(file_obj: TextIO) -> ColumnStore:
+        reader = csv.reader(file_obj)
+        idx = {name: i for i, name in enumerate(next(reader, []))}
+        names = ["Year", "Market", "Category", "Sub.Category", "Sales", "Profit", "Discount",
+                 "Quantity", "Shipping.Cost"]
+        if not idx:
+            # Empty file (no header): an empty store, as stream_orders yields nothing
+            idx = {name: i for i, name in enumerate(names)}
+        names += [name for name in ("Order.Date", "Ship.Date") if name in idx]
+        # Project just the needed fields per row, then transpose them into per-column tuples
+        pick = itemgetter(*(idx[name] for name in names))
+        # filter(None, ...) drops blank lines (csv.reader yields [] for them), as DictReader did
+        columns = dict(zip(names, zip(*map(pick, filter(None, reader))))) or dict.fromkeys(names, ())
+        missing = ("",) * len(columns["Year"])
+
+        year_codes, years = encode(list(map(int, columns["Year"])))
+        market_codes, markets = encode(columns["Market"])
+        category_codes, categories = encode(columns["Category"])
+        sub_category_codes, sub_categories = encode(columns["Sub.Category"])
+        sales = array("d", map(float, columns["Sales"]))
+        profit = array("d", map(float, columns["Profit"]))
+        discount = array("d", map(float, columns["Discount"]))
+        quantity = array("i", map(int, columns["Quantity"]))
+        shipping_cost = array("d", map(float, columns["Shipping.Cost"]))
+        order_ts = timestamps(columns.get("Order.Date", missing))
+        ship_ts = timestamps(columns.get("Ship.Date", missing))
+
+        return ColumnStore(
+            year_codes=year_codes,
+            years=years,
+            market_codes=market_codes,
+            markets=markets,
+            category_codes=category_codes,
+            categories=categories,
+            sub_category_codes=sub_category_codes,
+            sub_categories=sub_categories,
+            sales=sales,
+            profit=profit,
+            discount=discount,
+            quantity=quantity,
+            shipping_cost=shipping_cost,
+            order_ts=order_ts,
+            ship_ts=ship_ts,
+        )
+
+    # Accept either a file-like object (for tests/StringIO) or a filesystem path
+    if hasattr(source, "read"):
+        return read(source)
+    with Path(source).open(newline="", encoding="utf-8") as f:
+        return read(f)
+
+
+def load_columns_cached(path: str | Path | TextIO = CSV_PATH) -> ColumnStore:
+    """
+    Parse-once entry point for queries: the ColumnStore for `path` is cached per
+    process, so sibling queries in one run share a single CSV parse.
+
+    The key is the resolved path plus its mtime, size and inode, so an edited or
+    replaced file is re-read even on filesystems with coarse timestamps.
+    File-like objects are read directly, uncached.
+    Callers must treat the returned columns as read-only.
+    """
+    if hasattr(path, "read"):
+        return load_columns(path)
+    resolved = Path(path).resolve()
+    st = resolved.stat()
+    return _load_columns_cached(str(resolved), st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+@lru_cache(maxsize=4)
+def _load_columns_cached(resolved_path: str, mtime_ns: int, size: int, inode: int) -> ColumnStore:
+    return load_columns(resolved_path)
@@ -1,13 +1,15 @@
 
 import heapq
-from collections import defaultdict
+from math import prod
 from grouping_aggregation_helpers import (
-    aggregate_mean_by_key,
-    aggregate_min_max_count_by_key,
-    aggregate_stddev_by_key,
-    aggregate_sum_by_key,
+    aggregate_min_max_count_by_codes,
+    aggregate_stddev_by_codes,
+    aggregate_sum_by_codes,
+    aggregate_sums_by_codes,
+    pack_codes,
+    unpack_keys,
 )
-from orders import stream_orders        
+from orders import load_columns_cached
 from pathlib import Path
 from typing import Dict, Optional
 
@@ -15,13 +17,12 @@ from typing import Dict, Optional
 def sales_by_year_region_category(path: str | Path) -> Dict[tuple[int, str, str], float]:
     """
     Compute total sales per (Year, Region, Category).
-    Demonstrates composite key grouping using FP-style pipelines.
+    Composite key is packed into a single int code per row, decoded at the end.
     """
-    return aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.year, o.market, o.category),
-        value_fn=lambda o: o.sales,
-    )
+    cols = load_columns_cached(path)
+    vocabs = (cols.years, cols.markets, cols.categories)
+    codes = pack_codes((cols.year_codes, cols.market_codes, cols.category_codes), vocabs)
+    return unpack_keys(aggregate_sum_by_codes(codes, cols.sales), vocabs)
 
 def yoy_category_sales_trends(path: str | Path) -> Dict[tuple[str, str], list[tuple[int, float, float, float]]]:
     """
@@ -35,35 +36,33 @@ def yoy_category_sales_trends(path: str | Path) -> Dict[tuple[str, str], list[tu
            ]
         }
     """
-    # 1. Get raw totals per (year, region, category)
-    totals = sales_by_year_region_category(path)
-
-    # 2. Reorganize by (region, category)
-    grouped: Dict[tuple[str, str], list[tuple[int, float]]] = defaultdict(list)
+    cols = load_columns_cached(path)
 
-    for (year, region, category), sales in totals.items():
-        grouped[(region, category)].append((year, sales))
+    # 1. Totals per packed (region, category, year) code
+    codes = pack_codes(
+        (cols.market_codes, cols.category_codes, cols.year_codes),
+        (cols.markets, cols.categories, cols.years),
+    )
+    totals = aggregate_sum_by_codes(codes, cols.sales)
 
-    # 3. Sort years and compute YOY change
+    # 2. One global sort of the (few) totals by group then calendar year, and a single
+    #    walk: the previous entry is the prior year whenever it is in the same group
     yoy_results: Dict[tuple[str, str], list[tuple[int, float, float, float]]] = {}
-
-    for key, entries in grouped.items():
-        # Sort by year
-        entries = sorted(entries, key=lambda x: x[0])
-
-        trends = []
-        prev_sales = None
-
-        for year, sales in entries:
-            if prev_sales is None:
-                trends.append((year, sales, None, None))  # First year → no YOY comparison
-            else:
-                yoy_change = ( (sales - prev_sales) / prev_sales)  if prev_sales != 0 else None
-                trends.append((year, sales, prev_sales, yoy_change))
-
-            prev_sales = sales
-
-        yoy_results[key] = trends
+    years, n_years, n_categories = cols.years, len(cols.years), len(cols.categories)
+    prev_group = None
+
+    for code in sorted(totals, key=lambda c: (c // n_years, years[c % n_years])):
+        group, year_code = divmod(code, n_years)
+        year, sales = years[year_code], totals[code]
+        if group != prev_group:
+            market_code, category_code = divmod(group, n_categories)
+            trends = yoy_results[(cols.markets[market_code], cols.categories[category_code])] = []
+            trends.append((year, sales, None, None))  # First year → no YOY comparison
+        else:
+            prev_sales = trends[-1][1]
+            yoy_change = ((sales - prev_sales) / prev_sales) if prev_sales != 0 else None
+            trends.append((year, sales, prev_sales, yoy_change))
+        prev_group = group
 
     return yoy_results
 
@@ -73,20 +72,14 @@ def profit_margin_by_category_subcategory(path: str | Path) -> Dict[tuple[str, s
 
     Returns a dict of {(category, sub_category): margin}. If total sales is 0, margin is None.
     """
-    total_sales = aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.category, o.sub_category),
-        value_fn=lambda o: o.sales,
-    )
-    total_profit = aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.category, o.sub_category),
-        value_fn=lambda o: o.profit,
-    )
+    # (sales, profit) totals in one pass over the columns
+    cols = load_columns_cached(path)
+    vocabs = (cols.categories, cols.sub_categories)
+    codes = pack_codes((cols.category_codes, cols.sub_category_codes), vocabs)
+    totals = unpack_keys(aggregate_sums_by_codes(codes, (cols.sales, cols.profit)), vocabs)
 
     margins: Dict[tuple[str, str], float | None] = {}
-    for key, sales in total_sales.items():
-        profit = total_profit.get(key, 0.0)
+    for key, (sales, profit) in totals.items():
         margins[key] = (profit / sales) if sales else None
 
     return margins
@@ -96,39 +89,33 @@ def top_categories_by_margin(path: str | Path, n: int = 5) -> list[tuple[str, st
     Return the top N (category, sub-category) pairs by profit margin (profit / sales).
     Ignores entries with zero sales (margin is undefined).
     """
-    total_sales = aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.category, o.sub_category),
-        value_fn=lambda o: o.sales,
-    )
-    total_profit = aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.category, o.sub_category),
-        value_fn=lambda o: o.profit,
-    )
-
-    heap: list[tuple[float, str, str]] = []  # (margin, category, sub_category)
-    for (category, sub_category), sales in total_sales.items():
-        if not sales:
-            continue
-        margin = total_profit.get((category, sub_category), 0.0) / sales
-        heapq.heappush(heap, (margin, category, sub_category))
-        if len(heap) > n:
-            heapq.heappop(heap)  # keep only top n by popping smallest
+    return top_margins(profit_margin_by_category_subcategory(path), n)
 
-    top = sorted(heap, key=lambda x: x[0], reverse=True)
+def top_margins(margins: Dict[tuple[str, str], float | None], n: int = 5) -> list[tuple[str, str, float]]:
+    """
+    Top N entries of an already computed profit_margin_by_category_subcategory result,
+    so callers holding the margins do not aggregate the columns a second time.
+    """
+    # nlargest keeps a size-n heap internally; ties on margin fall back to (category, sub_category)
+    top = heapq.nlargest(
+        n,
+        (
+            (margin, category, sub_category)
+            for (category, sub_category), margin in margins.items()
+            if margin is not None
+        ),
+    )
     return [(category, sub_category, margin) for margin, category, sub_category in top]
 
 def total_discounted_profit(path: str | Path) -> float:
     """
     Total profit from orders where a discount was applied.
     """
-    totals = aggregate_sum_by_key(
-        filter(lambda o: o.discount > 0, stream_orders(path)),
-        key_fn=lambda _: "all",
-        value_fn=lambda o: o.profit,
+    cols = load_columns_cached(path)
+    return sum(
+        (profit for profit, discount in zip(cols.profit, cols.discount) if discount > 0),
+        0.0,
     )
-    return totals.get("all", 0.0)
 
 
 def discounted_profit_share(path: str | Path) -> Optional[float]:
@@ -138,12 +125,13 @@ def discounted_profit_share(path: str | Path) -> Optional[float]:
     Returns:
         float in [0,1] or None if total profit is zero (undefined share).
     """
-    discounted = total_discounted_profit(path)
-    total = aggregate_sum_by_key(
-        stream_orders(path),
-        key_fn=lambda _: "all",
-        value_fn=lambda o: o.profit,
-    ).get("all", 0.0)
+    cols = load_columns_cached(path)
+    # One pass over the columns accumulates both the total and the discounted share
+    total = discounted = 0.0
+    for profit, discount in zip(cols.profit, cols.discount):
+        total += profit
+        if discount > 0:
+            discounted += profit
 
     return (discounted / total) if total else None
 
@@ -152,13 +140,14 @@ def average_fulfillment_days(path: str | Path) -> Optional[float]:
     Average fulfillment time in days: mean(Ship.Date - Order.Date).
     Returns None if no orders have both dates.
     """
-    with_dates = filter(lambda o: o.order_date and o.ship_date, stream_orders(path))
-    mean_map = aggregate_mean_by_key(
-        with_dates,
-        key_fn=lambda _: "all",
-        value_fn=lambda o: (o.ship_date - o.order_date).total_seconds() / 86400.0,
-    )
-    return mean_map.get("all")
+    cols = load_columns_cached(path)
+    # Missing dates are NaN, and NaN != NaN, so the self-comparison drops them
+    days = [
+        (ship - order) / 86400.0
+        for order, ship in zip(cols.order_ts, cols.ship_ts)
+        if order == order and ship == ship
+    ]
+    return (sum(days) / len(days)) if days else None
 
 
 
@@ -166,21 +155,19 @@ def profit_std_by_market_category(path: str | Path, sample: bool = True) -> Dict
     """
     Standard deviation of profit per (Market, Category).
     """
-    return aggregate_stddev_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.market, o.category),
-        value_fn=lambda o: o.profit,
-        sample=sample,
-    )
+    cols = load_columns_cached(path)
+    vocabs = (cols.markets, cols.categories)
+    codes = pack_codes((cols.market_codes, cols.category_codes), vocabs)
+    stds = aggregate_stddev_by_codes(codes, cols.profit, prod(map(len, vocabs)), sample=sample)
+    return unpack_keys(stds, vocabs)
 
 
 def profit_min_max_count_by_market_category(path: str | Path) -> Dict[tuple[str, str], tuple[float, float, int]]:
     """
     Min, max, count of profit per (Market, Category).
     """
-    return aggregate_min_max_count_by_key(
-        stream_orders(path),
-        key_fn=lambda o: (o.market, o.category),
-        value_fn=lambda o: o.profit,
-    )
+    cols = load_columns_cached(path)
+    vocabs = (cols.markets, cols.categories)
+    codes = pack_codes((cols.market_codes, cols.category_codes), vocabs)
+    return unpack_keys(aggregate_min_max_count_by_codes(codes, cols.profit), vocabs)
 
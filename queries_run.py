@@ -1,22 +1,26 @@
 
 
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, Sequence, Tuple
+from typing import Dict, Iterable, Optional, Sequence, Tuple
 
 
 ## This file just runs all queries and prints formatted tables to console.
+## print_* functions only format precomputed query results; run_all computes them.
 from queries import (
     discounted_profit_share,
     profit_margin_by_category_subcategory,
     profit_min_max_count_by_market_category,
     sales_by_year_region_category,
-    top_categories_by_margin,
+    top_margins,
     total_discounted_profit,
     profit_std_by_market_category,
     average_fulfillment_days,
     yoy_category_sales_trends,
 )
 
+from orders import load_columns_cached
+
 CSV_PATH = Path("data/orders.csv")
 
 
@@ -27,21 +31,19 @@ def print_table(title: str, headers: Sequence[str], rows: Iterable[Sequence[str]
         print("(no rows)\n")
         return
 
-    col_widths = [len(h)+15 for h in headers]
-    for row in rows:
-        for i, cell in enumerate(row):
-            col_widths[i] = max(col_widths[i], len(str(cell)))
+    col_widths = [
+        max(len(h) + 15, max(len(str(row[i])) for row in rows))
+        for i, h in enumerate(headers)
+    ]
 
     fmt = " ".join(f"{{:<{w}}}" for w in col_widths)
-    print(fmt.format(*headers))
-    print("-" * (sum(col_widths) + len(col_widths) - 1))
-    for row in rows:
-        print(fmt.format(*row))
-    print()
+    lines = [fmt.format(*headers), "-" * (sum(col_widths) + len(col_widths) - 1)]
+    lines.extend(fmt.format(*row) for row in rows)
+    # One write for the whole table instead of one print() per row
+    print("\n".join(lines) + "\n")
 
 
-def print_sales(path: Path = CSV_PATH) -> None:
-    sales_summary = sales_by_year_region_category(path)
+def print_sales(sales_summary: Dict[tuple[int, str, str], float]) -> None:
     rows = [
         (str(year), region, category, f"{total_sales:,.2f}")
         for (year, region, category), total_sales in sorted(sales_summary.items())
@@ -53,8 +55,7 @@ def print_sales(path: Path = CSV_PATH) -> None:
     )
 
 
-def print_yoy(path: Path = CSV_PATH) -> None:
-    yoy_data = yoy_category_sales_trends(path)
+def print_yoy(yoy_data: Dict[tuple[str, str], list[tuple[int, float, float, float]]]) -> None:
     rows = []
     for (region, category), entries in sorted(yoy_data.items()):
         for year, sales, prev_sales, change in entries:
@@ -78,8 +79,7 @@ def print_yoy(path: Path = CSV_PATH) -> None:
     )
 
 
-def print_margins(path: Path = CSV_PATH) -> None:
-    margins = profit_margin_by_category_subcategory(path)
+def print_margins(margins: Dict[tuple[str, str], Optional[float]]) -> None:
     rows = [
         (category, sub_category, "N/A" if margin is None else f"{margin*100:,.2f}%")
         for (category, sub_category), margin in sorted(
@@ -95,21 +95,18 @@ def print_margins(path: Path = CSV_PATH) -> None:
     )
 
 
-def print_top_category_margins(path: Path = CSV_PATH, n: int = 5) -> None:
-    top = top_categories_by_margin(path, n)
+def print_top_category_margins(top: list[tuple[str, str, float]]) -> None:
     rows = [
         (category, sub_category, f"{margin*100:,.2f}%")
         for category, sub_category, margin in top
     ]
     print_table(
-        f"Top {n} Category/Sub-Category by Profit Margin",
+        f"Top {len(top)} Category/Sub-Category by Profit Margin",
         ("Category", "Sub-Category", "Margin"),
         rows,
     )
 
-def print_discounted_profit(path: Path = CSV_PATH) -> None:
-    discounted = total_discounted_profit(path)
-    share = discounted_profit_share(path)
+def print_discounted_profit(discounted: float, share: Optional[float]) -> None:
     share_fmt = "N/A" if share is None else f"{share*100:,.2f}%"
     print_table(
         "Profit from Discounted Orders",
@@ -120,8 +117,7 @@ def print_discounted_profit(path: Path = CSV_PATH) -> None:
         ],
     )
 
-def print_average_fulfillment(path: Path = CSV_PATH) -> None:
-    avg_days = average_fulfillment_days(path)
+def print_average_fulfillment(avg_days: Optional[float]) -> None:
     avg_fmt = "N/A" if avg_days is None else f"{avg_days:.2f} days"
     print_table(
         "Average Fulfillment Time",
@@ -129,12 +125,14 @@ def print_average_fulfillment(path: Path = CSV_PATH) -> None:
         [("Avg (Ship.Date - Order.Date)", avg_fmt)],
     )
 
-def print_profit_volatility(path: Path = CSV_PATH, sample: bool = True) -> None:
-    stds = profit_std_by_market_category(path, sample=sample)
-    ranges = profit_min_max_count_by_market_category(path)
+def print_profit_volatility(
+    stds: Dict[tuple[str, str], float],
+    ranges: Dict[tuple[str, str], tuple[float, float, int]],
+    sample: bool = True,
+) -> None:
     sorted_items = sorted(
         stds.items(),
-        key=lambda kv: kv[1],  # sort by stddev
+        key=itemgetter(1),  # sort by stddev
         reverse=True,
     )
     rows = []
@@ -158,13 +156,25 @@ def print_profit_volatility(path: Path = CSV_PATH, sample: bool = True) -> None:
 
 
 def run_all(path: Path = CSV_PATH) -> None:
-    print_sales(path)
-    print_yoy(path)
-    print_margins(path)
-    print_top_category_margins(path)
-    print_discounted_profit(path)
-    print_average_fulfillment(path)
-    print_profit_volatility(path)
+    """
+    Run every query and print the tables in a fixed order. The CSV is parsed once;
+    each query then aggregates the cached column store in-process.
+    """
+    load_columns_cached(path)
+
+    print_sales(sales_by_year_region_category(path))
+    print_yoy(yoy_category_sales_trends(path))
+    margins = profit_margin_by_category_subcategory(path)
+    print_margins(margins)
+    # Derived from the margins already computed rather than re-aggregated
+    print_top_category_margins(top_margins(margins, 5))
+    print_discounted_profit(total_discounted_profit(path), discounted_profit_share(path))
+    print_average_fulfillment(average_fulfillment_days(path))
+    print_profit_volatility(
+        profit_std_by_market_category(path, sample=True),
+        profit_min_max_count_by_market_category(path),
+        sample=True,
+    )
 
 
 if __name__ == "__main__":
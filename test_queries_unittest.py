@@ -1,3 +1,5 @@
+import math
+import os
 import unittest
 import tempfile
 from io import StringIO
@@ -9,14 +11,22 @@ from grouping_aggregation_helpers import (
     aggregate_mean_by_key,
     aggregate_stddev_by_key,
     aggregate_sum_by_key,
+    aggregate_sums_by_key,
+    aggregate_sum_by_codes,
+    aggregate_sums_by_codes,
+    aggregate_stddev_by_codes,
+    aggregate_min_max_count_by_codes,
+    pack_codes,
+    unpack_keys,
     aggregate_min_max_count_by_key,
 )
-from orders import Order, stream_orders
+from orders import Order, collect_orders, load_columns, load_columns_cached, parse_datetime, stream_orders
 from queries import (
     sales_by_year_region_category,
     yoy_category_sales_trends,
     profit_margin_by_category_subcategory,
     top_categories_by_margin,
+    top_margins,
     total_discounted_profit,
     discounted_profit_share,
     average_fulfillment_days,
@@ -84,6 +94,15 @@ class HelperAggregationTests(unittest.TestCase):
         self.assertEqual(totals["Furniture"], 300.0)
         self.assertEqual(totals["Office Supplies"], 50.0)
 
+    def test_aggregate_sums_by_key(self):
+        totals = aggregate_sums_by_key(
+            self.orders,
+            key_fn=lambda o: o.category,
+            value_fns=(lambda o: o.sales, lambda o: o.profit),
+        )
+        self.assertEqual(totals["Furniture"], (300.0, 30.0))
+        self.assertEqual(totals["Office Supplies"], (50.0, 5.0))
+
     def test_aggregate_mean_by_key(self):
         means = aggregate_mean_by_key(
             self.orders,
@@ -113,6 +132,34 @@ class HelperAggregationTests(unittest.TestCase):
         self.assertEqual(stats["Office Supplies"], (5.0, 5.0, 1))
 
 
+class ColumnarAggregationTests(unittest.TestCase):
+    def test_pack_and_unpack_codes_round_trip(self):
+        vocabs = (("2020", "2021"), ("US", "CAN", "EU"))
+        codes = pack_codes(([0, 1, 1, 0], [2, 0, 2, 2]), vocabs)
+        totals = aggregate_sum_by_codes(codes, [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(
+            unpack_keys(totals, vocabs),
+            {("2020", "EU"): 5.0, ("2021", "US"): 2.0, ("2021", "EU"): 3.0},
+        )
+
+    def test_aggregate_sums_by_codes(self):
+        totals = aggregate_sums_by_codes([0, 1, 0], ([1.0, 2.0, 3.0], [10.0, 20.0, 30.0]))
+        self.assertEqual(totals, {0: (4.0, 40.0), 1: (2.0, 20.0)})
+
+    def test_aggregate_stddev_by_codes(self):
+        codes = [0, 2, 0, 2, 2]
+        values = [100.0, 1.0, 200.0, 2.0, 3.0]
+        population = aggregate_stddev_by_codes(codes, values, n_groups=3, sample=False)
+        self.assertEqual(set(population), {0, 2})  # unused code 1 is not reported
+        self.assertAlmostEqual(population[0], 50.0)
+        sample = aggregate_stddev_by_codes(codes, values, n_groups=3)
+        self.assertAlmostEqual(sample[2], 1.0)
+
+    def test_aggregate_min_max_count_by_codes(self):
+        stats = aggregate_min_max_count_by_codes([1, 0, 1, 1], [5.0, 2.0, -3.0, 8.0])
+        self.assertEqual(stats, {1: (-3.0, 8.0, 3), 0: (2.0, 2.0, 1)})
+
+
 class StreamParsingTests(unittest.TestCase):
     def test_stream_orders_parses_dates_and_products(self):
         csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost,Order.Date,Ship.Date,Product.ID,Product.Name
@@ -137,6 +184,19 @@ Furniture,Chairs,CA,USA,C2,Bob,2020,US,150.0,15.0,0.0,1,4.0,2020/02/01 00:00:00.
         self.assertEqual(o2.order_date.date(), datetime(2020, 2, 1).date())
         self.assertEqual(o2.ship_date.date(), datetime(2020, 2, 4).date())
 
+    def test_parse_datetime_formats_and_bad_values(self):
+        self.assertEqual(parse_datetime("2020-01-02 03:04:05.000"), datetime(2020, 1, 2, 3, 4, 5))
+        self.assertEqual(parse_datetime("2020/01/02 03:04:05.000"), datetime(2020, 1, 2, 3, 4, 5))
+        self.assertEqual(parse_datetime("2020-01-02"), datetime(2020, 1, 2))
+        self.assertIsNone(parse_datetime(""))
+        self.assertIsNone(parse_datetime("not a date"))
+        # Slash fast path only takes well-formed values; anything else behaves like strptime
+        self.assertIsNone(parse_datetime("2020/01/02 03:04:05."))
+        self.assertIsNone(parse_datetime("2020/01/02 03:04:05.1_2"))
+        self.assertIsNone(parse_datetime("2020/01/02x03:04:05.000"))
+        self.assertIsNone(parse_datetime("2020/+1/02 03:04:05.000"))
+        self.assertIsNone(parse_datetime("2020/13/02 03:04:05.000"))
+
     def test_stream_orders_reads_from_path(self):
         csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
 Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
@@ -149,6 +209,106 @@ Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
         self.assertEqual(len(orders), 1)
         self.assertEqual(orders[0].customer_id, "C1")
 
+    def test_stream_orders_skips_blank_lines(self):
+        csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
+Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
+
+Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,60.0,0.0,1,7.0
+
+"""
+        orders = list(stream_orders(StringIO(csv_text)))
+        self.assertEqual([o.customer_id for o in orders], ["C1", "C2"])
+
+    def test_stream_orders_empty_file_yields_nothing(self):
+        self.assertEqual(list(stream_orders(StringIO(""))), [])
+
+    def test_collect_orders_supports_multiple_passes(self):
+        csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
+Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
+Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,60.0,0.0,1,7.0
+"""
+        orders = collect_orders(StringIO(csv_text))
+        sales = aggregate_sum_by_key(orders, key_fn=lambda o: o.category, value_fn=lambda o: o.sales)
+        profit = aggregate_sum_by_key(orders, key_fn=lambda o: o.category, value_fn=lambda o: o.profit)
+        self.assertEqual(sales["Furniture"], 300.0)
+        self.assertEqual(profit["Furniture"], 70.0)
+
+    def test_load_columns_encodes_keys_and_dates(self):
+        csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost,Order.Date,Ship.Date
+Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0,2020-01-01 00:00:00.000,2020-01-03 00:00:00.000
+Office Supplies,Paper,ON,CAN,C2,Bob,2021,CAN,50.0,-5.0,0.2,1,3.0,2021/01/01 00:00:00.000,
+Furniture,Tables,CA,USA,C3,Eve,2020,US,200.0,20.0,0.0,1,7.0,2020-02-01 00:00:00.000,2020-02-04 00:00:00.000
+"""
+        cols = load_columns(StringIO(csv_text))
+        self.assertEqual(cols.years, (2020, 2021))
+        self.assertEqual(list(cols.year_codes), [0, 1, 0])
+        self.assertEqual(cols.categories, ("Furniture", "Office Supplies"))
+        self.assertEqual(list(cols.category_codes), [0, 1, 0])
+        self.assertEqual(cols.sub_categories, ("Chairs", "Paper", "Tables"))
+        self.assertEqual(list(cols.sales), [100.0, 50.0, 200.0])
+        self.assertEqual(list(cols.quantity), [2, 1, 1])
+        self.assertEqual(cols.ship_ts[0] - cols.order_ts[0], 2 * 86400.0)
+        self.assertTrue(math.isnan(cols.ship_ts[1]))
+
+    def test_load_columns_skips_blank_lines(self):
+        csv_text = """Category,Sub.Category,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
+
+Furniture,Chairs,2020,US,100.0,10.0,0.0,2,5.0
+
+Furniture,Chairs,2021,US,50.0,5.0,0.0,1,3.0
+
+"""
+        cols = load_columns(StringIO(csv_text))
+        self.assertEqual(list(cols.sales), [100.0, 50.0])
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
+            sales = sales_by_year_region_category("ignored.csv")
+        self.assertEqual(sales, {(2020, "US", "Furniture"): 100.0, (2021, "US", "Furniture"): 50.0})
+
+    def test_load_columns_empty_file_gives_empty_store(self):
+        for csv_text in ("", "Category,Sub.Category,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost\n"):
+            cols = load_columns(StringIO(csv_text))
+            self.assertEqual(cols.years, ())
+            self.assertEqual(len(cols.sales), 0)
+            self.assertEqual(len(cols.order_ts), 0)
+            with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
+                self.assertEqual(sales_by_year_region_category("ignored.csv"), {})
+                self.assertEqual(yoy_category_sales_trends("ignored.csv"), {})
+                self.assertEqual(profit_std_by_market_category("ignored.csv"), {})
+                self.assertEqual(total_discounted_profit("ignored.csv"), 0.0)
+                self.assertIsNone(discounted_profit_share("ignored.csv"))
+                self.assertIsNone(average_fulfillment_days("ignored.csv"))
+
+    def test_load_columns_handles_offset_aware_dates(self):
+        csv_text = """Category,Sub.Category,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost,Order.Date,Ship.Date
+Furniture,Chairs,2020,US,100.0,10.0,0.0,2,5.0,2020-01-01T00:00:00+00:00,2020-01-03T00:00:00+02:00
+"""
+        cols = load_columns(StringIO(csv_text))
+        self.assertEqual(cols.order_ts[0], 1577836800.0)  # 2020-01-01 00:00 UTC
+        self.assertEqual(cols.ship_ts[0] - cols.order_ts[0], 2 * 86400.0 - 2 * 3600.0)
+
+    def test_queries_accept_file_like_objects(self):
+        csv_text = """Category,Sub.Category,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
+Furniture,Chairs,2020,US,100.0,10.0,0.0,2,5.0
+"""
+        self.assertEqual(
+            sales_by_year_region_category(StringIO(csv_text)),
+            {(2020, "US", "Furniture"): 100.0},
+        )
+
+    def test_load_columns_cached_reuses_parse_until_file_changes(self):
+        header = "Category,Sub.Category,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost\n"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "orders.csv"
+            path.write_text(header + "Furniture,Chairs,2020,US,100.0,10.0,0.0,2,5.0\n", encoding="utf-8")
+            first = load_columns_cached(path)
+            self.assertIs(load_columns_cached(str(path)), first)
+
+            # Same mtime (coarse timestamps) but a different size is still a cache miss
+            mtime_ns = path.stat().st_mtime_ns
+            path.write_text(header + "Furniture,Chairs,2020,US,1250.0,10.0,0.0,2,5.0\n", encoding="utf-8")
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+            self.assertEqual(list(load_columns_cached(path).sales), [1250.0])
+
 
 class QueryIntegrationTests(unittest.TestCase):
     def test_sales_and_yoy(self):
@@ -156,7 +316,7 @@ class QueryIntegrationTests(unittest.TestCase):
 Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0,2020-01-01 00:00:00.000,2020-01-03 00:00:00.000
 Furniture,Chairs,CA,USA,C2,Bob,2021,US,50.0,5.0,0.0,1,3.0,2021-01-01 00:00:00.000,2021-01-02 00:00:00.000
 """
-        with patch("queries.stream_orders", lambda path: stream_orders(StringIO(csv_text))):
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
             sales = sales_by_year_region_category("ignored.csv")
             self.assertEqual(sales[(2020, "US", "Furniture")], 100.0)
             self.assertEqual(sales[(2021, "US", "Furniture")], 50.0)
@@ -166,13 +326,26 @@ Furniture,Chairs,CA,USA,C2,Bob,2021,US,50.0,5.0,0.0,1,3.0,2021-01-01 00:00:00.00
             self.assertEqual(trend[0], (2020, 100.0, None, None))
             self.assertAlmostEqual(trend[1][3], -0.5)  # 50 vs 100 → -50%
 
+    def test_yoy_orders_years_chronologically_per_group(self):
+        csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
+Furniture,Chairs,CA,USA,C1,Alice,2022,US,300.0,10.0,0.0,2,5.0
+Technology,Phones,ON,CAN,C2,Bob,2021,CAN,80.0,5.0,0.0,1,3.0
+Furniture,Chairs,CA,USA,C3,Eve,2020,US,100.0,10.0,0.0,2,5.0
+Furniture,Chairs,CA,USA,C4,Dan,2021,US,150.0,10.0,0.0,2,5.0
+"""
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
+            yoy = yoy_category_sales_trends("ignored.csv")
+        self.assertEqual([entry[0] for entry in yoy[("US", "Furniture")]], [2020, 2021, 2022])
+        self.assertAlmostEqual(yoy[("US", "Furniture")][2][3], 1.0)  # 300 vs 150
+        self.assertEqual(yoy[("CAN", "Technology")], [(2021, 80.0, None, None)])
+
     def test_profit_margin_and_top_categories(self):
         csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
 Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
 Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,60.0,0.0,1,7.0
 Office Supplies,Paper,NY,USA,C3,Eve,2020,US,50.0,5.0,0.0,5,2.0
 """
-        with patch("queries.stream_orders", lambda path: stream_orders(StringIO(csv_text))):
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
             margins = profit_margin_by_category_subcategory("ignored.csv")
             self.assertAlmostEqual(margins[("Furniture", "Chairs")], 0.10)
             self.assertAlmostEqual(margins[("Furniture", "Tables")], 0.30)
@@ -183,12 +356,16 @@ Office Supplies,Paper,NY,USA,C3,Eve,2020,US,50.0,5.0,0.0,5,2.0
             self.assertEqual(top[0][0], "Furniture")
             self.assertEqual(top[0][1], "Tables")
 
+            # Precomputed margins give the same ranking; undefined (None) margins are skipped
+            margins[("Technology", "Phones")] = None
+            self.assertEqual(top_margins(margins, n=2), top)
+
     def test_discounted_profit_and_share(self):
         csv_text = """Category,Sub.Category,State,Country,Customer.ID,Customer.Name,Year,Market,Sales,Profit,Discount,Quantity,Shipping.Cost
 Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
 Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,50.0,0.1,1,7.0
 """
-        with patch("queries.stream_orders", lambda path: stream_orders(StringIO(csv_text))):
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
             discounted = total_discounted_profit("ignored.csv")
             self.assertEqual(discounted, 50.0)
 
@@ -201,7 +378,7 @@ Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,50.0,0.1,1,7.0
 Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0,2020-01-01 00:00:00.000,2020-01-03 00:00:00.000
 Furniture,Tables,CA,USA,C2,Bob,2020,US,200.0,60.0,0.0,1,7.0,2020-01-02 00:00:00.000,2020-01-05 00:00:00.000
 """
-        with patch("queries.stream_orders", lambda path: stream_orders(StringIO(csv_text))):
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
             avg = average_fulfillment_days("ignored.csv")
             # Durations: 2 days and 3 days -> mean 2.5
             self.assertAlmostEqual(avg, 2.5)
@@ -212,7 +389,7 @@ Furniture,Chairs,CA,USA,C1,Alice,2020,US,100.0,10.0,0.0,2,5.0
 Furniture,Chairs,CA,USA,C2,Bob,2020,US,200.0,30.0,0.0,1,7.0
 Furniture,Chairs,ON,CAN,C3,Eve,2020,CAN,150.0,20.0,0.0,1,6.0
 """
-        with patch("queries.stream_orders", lambda path: stream_orders(StringIO(csv_text))):
+        with patch("queries.load_columns_cached", lambda path: load_columns(StringIO(csv_text))):
             stds = profit_std_by_market_category("ignored.csv", sample=False)
             stats = profit_min_max_count_by_market_category("ignored.csv")
 